@@ -1,7 +1,131 @@
 """Алгоритм расчета рабочего времени по городским графикам."""
 
-from datetime import datetime, time, timedelta
-from typing import Iterable, Optional, Tuple
+import re
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, time
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+
+# График работы: {"weekdays": (начало, конец), "friday": (начало, конец)}
+Schedule = Dict[str, Tuple[time, time]]
+# Рабочие часы пн..пт в микросекундах от полуночи:
+# (((начало, конец), ...), (длительность дня, ...), длительность недели)
+WeekTable = Tuple[Tuple[Tuple[int, int], ...], Tuple[int, ...], int]
+
+_EPOCH_ORDINAL = datetime(1970, 1, 1).toordinal()
+_HOUR_MICROSECONDS = 3_600_000_000
+_DAY_MICROSECONDS = 24 * _HOUR_MICROSECONDS
+# Сколько дней до следующего дня для проверки: из субботы и воскресенья
+# сразу переходим к понедельнику
+_ADVANCE_DAYS = (1, 1, 1, 1, 1, 2, 1)
+# Меньше строк на процесс не окупают запуск интерпретатора и передачу данных
+_MIN_ROWS_PER_WORKER = 20000
+
+
+def _time_to_microseconds(value: time) -> int:
+    """Переводит время суток в количество микросекунд от полуночи."""
+    return (
+        (value.hour * 3600 + value.minute * 60 + value.second) * 1_000_000
+        + value.microsecond
+    )
+
+
+def _week_table(schedule: Schedule) -> WeekTable:
+    """
+    Раскладывает график по дням недели пн..пт в микросекундах от полуночи.
+
+    Длительности дней и недели считаются здесь же, один раз на график.
+    """
+    weekdays = tuple(_time_to_microseconds(value) for value in schedule["weekdays"])
+    friday = tuple(_time_to_microseconds(value) for value in schedule["friday"])
+    hours = (weekdays, weekdays, weekdays, weekdays, friday)
+    day_lengths = tuple(max(0, end - start) for start, end in hours)
+    return hours, day_lengths, sum(day_lengths)
+
+
+def _to_timestamp(dt: datetime) -> int:
+    """
+    Переводит наивный datetime в целые микросекунды от 1970-01-01.
+
+    Datetime с часовым поясом не поддерживаются, как и раньше: поля времени
+    без учета смещения дали бы неверный результат, поэтому - TypeError.
+    """
+    if dt.tzinfo is not None and dt.utcoffset() is not None:
+        raise TypeError("Поддерживаются только datetime без часового пояса.")
+    return (
+        (dt.toordinal() - _EPOCH_ORDINAL) * _DAY_MICROSECONDS
+        + (dt.hour * 3600 + dt.minute * 60 + dt.second) * 1_000_000
+        + dt.microsecond
+    )
+
+
+def _working_microseconds(start_ts: int, end_ts: int, week_table: WeekTable) -> int:
+    """
+    Считает рабочие микросекунды между двумя отметками времени.
+
+    Работает только с целыми числами; полные недели в середине интервала
+    добавляются формулой, перебираются не более 13 граничных дней.
+    """
+    if start_ts >= end_ts:
+        return 0
+
+    hours, day_lengths, week_length = week_table
+    day_length = _DAY_MICROSECONDS
+    first_day = start_ts // day_length
+    last_day = end_ts // day_length
+
+    if first_day == last_day:
+        # Интервал внутри одного дня - самый частый случай для времени реакции
+        weekday = (first_day + 3) % 7
+        if weekday >= 5:
+            return 0
+        day_ts = first_day * day_length
+        work_start, work_end = hours[weekday]
+        day_start = max(start_ts, day_ts + work_start)
+        day_end = min(end_ts, day_ts + work_end)
+        return max(0, day_end - day_start)
+
+    n_full_weeks = max(0, (last_day - first_day) // 7 - 1)
+
+    total = n_full_weeks * week_length
+    skip_days = 7 * n_full_weeks
+    day = first_day
+    weekday = (day + 3) % 7  # 1970-01-01 - четверг
+    while day <= last_day:
+        if weekday < 5:
+            if day == first_day or day == last_day:
+                # Граничный день: обрезаем рабочие часы началом/концом интервала
+                day_ts = day * day_length
+                work_start, work_end = hours[weekday]
+                day_start = max(start_ts, day_ts + work_start)
+                day_end = min(end_ts, day_ts + work_end)
+                if day_start < day_end:
+                    total += day_end - day_start
+            else:
+                total += day_lengths[weekday]
+
+        advance = _ADVANCE_DAYS[weekday]
+        weekday = (weekday + advance) % 7
+        # После первого дня перескакиваем уже посчитанные полные недели
+        day += advance + skip_days
+        skip_days = 0
+
+    return total
+
+
+def _batch_working_hours(
+    start_ts: List[int],
+    end_ts: List[int],
+    city_ids: List[int],
+    week_tables: List[WeekTable],
+) -> List[float]:
+    """Считает рабочие часы для строк, где город задан индексом в week_tables."""
+    working_microseconds = _working_microseconds
+    return [
+        working_microseconds(start, end, week_tables[city_id]) / _HOUR_MICROSECONDS
+        for start, end, city_id in zip(start_ts, end_ts, city_ids)
+    ]
 
 
 class WorkingTimeCalculator:
@@ -34,25 +158,58 @@ class WorkingTimeCalculator:
         },
     }
 
+    # Названия городов для вывода пользователю
+    CITY_NAMES_SORTED: Tuple[str, ...] = tuple(sorted(CITY_SCHEDULES))
+
     # График по умолчанию для городов, не указанных в CITY_SCHEDULES
     DEFAULT_SCHEDULE = {
         "weekdays": (time(9, 0), time(18, 0)),
         "friday": (time(9, 0), time(16, 45)),
     }
 
+    # Дополнительные варианты написания городов -> ключ в CITY_SCHEDULES
+    _CITY_ALIASES = {
+        "мск": "москва",
+        "г. москва": "москва",
+        "нн": "нижний новгород",
+        "н. новгород": "нижний новгород",
+        "н.новгород": "нижний новгород",
+        "г. нижний новгород": "нижний новгород",
+        "г. саров": "саров",
+        "г. новоуральск": "новоуральск",
+        "г. краснокаменск": "краснокаменск",
+    }
+
     @classmethod
+    @lru_cache(maxsize=256)
     def normalize_city_name(cls, city: str) -> str:
-        """Нормализует название города для поиска в расписаниях."""
+        """
+        Нормализует название города для поиска в расписаниях.
+
+        Результат кэшируется по классу и исходной строке.
+        """
         if not city:
             return ""
 
-        city_lower = city.lower().strip()
-
-        for city_key in cls.CITY_SCHEDULES:
-            if city_lower == city_key:
-                return city_key
-
-        for city_key in cls.CITY_SCHEDULES:
+        schedules, _ = cls._get_schedules()
+        aliases = cls._CITY_ALIASES
+        # Уже нормализованное название не требует копий строки
+        if city in schedules:
+            return city
+        city_key = aliases.get(city)
+        if city_key is not None:
+            return city_key
+
+        city_lower = city.strip().lower()
+
+        if city_lower in schedules:
+            return city_lower
+        city_key = aliases.get(city_lower)
+        if city_key is not None:
+            return city_key
+
+        # Редкие варианты написания: ищем ключ как подстроку
+        for city_key in schedules:
             if city_key in city_lower or city_lower in city_key:
                 return city_key
 
@@ -66,14 +223,9 @@ class WorkingTimeCalculator:
     @classmethod
     def get_working_hours(
         cls, dt: datetime, city: str
-    ) -> Optional[Tuple[time, time]]:
+    ) -> Tuple[time, time]:
         """Возвращает рабочие часы для указанного дня и города."""
-        city_normalized = cls.normalize_city_name(city)
-
-        if city_normalized in cls.CITY_SCHEDULES:
-            schedule = cls.CITY_SCHEDULES[city_normalized]
-        else:
-            schedule = cls.DEFAULT_SCHEDULE
+        schedule, _ = cls._get_schedule(city)
 
         if dt.weekday() == 4:  # Пятница
             return schedule["friday"]
@@ -92,53 +244,159 @@ class WorkingTimeCalculator:
         if start_dt >= end_dt:
             return 0.0
 
-        total_hours = 0.0
-        current_dt = start_dt
-
-        while current_dt < end_dt:
-            current_date = current_dt.date()
-
-            if not cls.is_working_day(current_dt):
-                if current_dt.weekday() == 5:  # Суббота
-                    current_dt = datetime.combine(
-                        current_date + timedelta(days=2), time(0, 0)
-                    )
-                elif current_dt.weekday() == 6:  # Воскресенье
-                    current_dt = datetime.combine(
-                        current_date + timedelta(days=1), time(0, 0)
-                    )
-                else:
-                    current_dt += timedelta(days=1)
-                continue
-
-            work_hours = cls.get_working_hours(current_dt, city)
-            if not work_hours:
-                current_dt = datetime.combine(
-                    current_date + timedelta(days=1), time(0, 0)
-                )
-                continue
+        return cls._calculate_cached(
+            _to_timestamp(start_dt),
+            _to_timestamp(end_dt),
+            cls.normalize_city_name(city),
+        )
 
-            work_start, work_end = work_hours
+    @classmethod
+    def make_city_calculator(
+        cls, city: str
+    ) -> Callable[[datetime, datetime], float]:
+        """
+        Возвращает функцию расчета рабочего времени для одного города.
 
-            if current_date == start_dt.date():
-                day_start = max(current_dt, datetime.combine(current_date, work_start))
-            else:
-                day_start = datetime.combine(current_date, work_start)
+        График города разрешается один раз при создании функции, поэтому
+        при многократных расчетах по одному городу поиск графика не повторяется.
+        """
+        week_table = cls._get_week_table(city)
 
-            if current_date == end_dt.date():
-                day_end = min(end_dt, datetime.combine(current_date, work_end))
-            else:
-                day_end = datetime.combine(current_date, work_end)
+        def calculate(start_dt: datetime, end_dt: datetime) -> float:
+            if start_dt >= end_dt:
+                return 0.0
+            total = _working_microseconds(
+                _to_timestamp(start_dt), _to_timestamp(end_dt), week_table
+            )
+            return total / _HOUR_MICROSECONDS
 
-            if day_start < day_end:
-                day_hours = (day_end - day_start).total_seconds() / 3600.0
-                total_hours += max(0.0, day_hours)
+        return calculate
 
-            current_dt = datetime.combine(
-                current_date + timedelta(days=1), time(0, 0)
+    @classmethod
+    def calculate_working_time_batch(
+        cls,
+        start_dts: Iterable[datetime],
+        end_dts: Iterable[datetime],
+        cities: Union[str, Iterable[str]],
+        workers: Optional[int] = None,
+    ) -> List[float]:
+        """
+        Рассчитывает рабочее время для набора интервалов (например, таблицы заявок).
+
+        Даты - datetime без часового пояса; столбцы с часовым поясом нужно
+        заранее привести к одному поясу и убрать tzinfo, иначе - TypeError.
+        cities - один город для всех интервалов или последовательность городов
+        той же длины; при разной длине входных данных - ValueError.
+        workers - наибольшее число процессов для больших наборов (не меньше
+        _MIN_ROWS_PER_WORKER строк на процесс); по умолчанию расчет идет
+        в текущем процессе.
+        Возвращает список часов в порядке входных данных.
+        """
+        rows: Iterable[Tuple[datetime, datetime, str]]
+        if isinstance(cities, str):
+            city = cities
+            rows = (
+                (start_dt, end_dt, city)
+                for start_dt, end_dt in zip(start_dts, end_dts, strict=True)
             )
+        else:
+            rows = zip(start_dts, end_dts, cities, strict=True)
+
+        # Города кодируются индексами в week_tables, даты - целыми микросекундами
+        city_ids: Dict[str, int] = {}
+        week_tables: List[WeekTable] = []
+        start_ts: List[int] = []
+        end_ts: List[int] = []
+        row_city_ids: List[int] = []
+        # Локальные имена в цикле дешевле глобальных и атрибутов
+        to_timestamp = _to_timestamp
+        get_city_id = city_ids.get
+
+        for start_dt, end_dt, city in rows:
+            city_id = get_city_id(city)
+            if city_id is None:
+                city_id = city_ids[city] = len(week_tables)
+                week_tables.append(cls._get_week_table(city))
+            start_ts.append(to_timestamp(start_dt))
+            end_ts.append(to_timestamp(end_dt))
+            row_city_ids.append(city_id)
+
+        workers = min(workers or 1, len(start_ts) // _MIN_ROWS_PER_WORKER)
+        if workers <= 1:
+            return _batch_working_hours(start_ts, end_ts, row_city_ids, week_tables)
+
+        # Строки независимы, поэтому делим их на равные части по процессам
+        chunk = -(-len(start_ts) // workers)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(
+                    _batch_working_hours,
+                    start_ts[i : i + chunk],
+                    end_ts[i : i + chunk],
+                    row_city_ids[i : i + chunk],
+                    week_tables,
+                )
+                for i in range(0, len(start_ts), chunk)
+            ]
+            result: List[float] = []
+            for future in futures:
+                result.extend(future.result())
+        return result
+
+    @classmethod
+    def clear_cache(cls) -> None:
+        """
+        Сбрасывает кэши графиков, названий городов и результатов.
+
+        Нужно вызвать после изменения CITY_SCHEDULES или DEFAULT_SCHEDULE
+        во время работы программы.
+        """
+        cls._get_schedules.cache_clear()
+        cls.normalize_city_name.cache_clear()
+        cls._calculate_cached.cache_clear()
+
+    @classmethod
+    @lru_cache(maxsize=None)
+    def _get_schedules(
+        cls,
+    ) -> Tuple[Dict[str, Tuple[Schedule, WeekTable]], Tuple[Schedule, WeekTable]]:
+        """
+        Разбирает графики класса при первом обращении.
 
-        return total_hours
+        Возвращает словарь город -> (график, рабочие часы по дням в микросекундах)
+        и такую же пару для графика по умолчанию. Графики копируются, поэтому
+        все методы видят один и тот же снимок до вызова clear_cache().
+        """
+        schedules = {
+            city: (dict(schedule), _week_table(schedule))
+            for city, schedule in cls.CITY_SCHEDULES.items()
+        }
+        default = (dict(cls.DEFAULT_SCHEDULE), _week_table(cls.DEFAULT_SCHEDULE))
+        return schedules, default
+
+    @classmethod
+    def _get_schedule(cls, city: str) -> Tuple[Schedule, WeekTable]:
+        """Возвращает график города и его рабочие часы по дням в микросекундах."""
+        schedules, default = cls._get_schedules()
+        return schedules.get(cls.normalize_city_name(city), default)
+
+    @classmethod
+    def _get_week_table(cls, city: str) -> WeekTable:
+        """Возвращает рабочие часы города по дням недели в микросекундах."""
+        return cls._get_schedule(city)[1]
+
+    @classmethod
+    @lru_cache(maxsize=4096)
+    def _calculate_cached(cls, start_ts: int, end_ts: int, city_key: str) -> float:
+        """
+        Рабочие часы между отметками времени для нормализованного города.
+
+        Время реакции, решения и общее время делят границы интервалов,
+        поэтому повторные расчеты берутся из кэша.
+        """
+        schedules, default = cls._get_schedules()
+        _, week_table = schedules.get(city_key, default)
+        return _working_microseconds(start_ts, end_ts, week_table) / _HOUR_MICROSECONDS
 
     @classmethod
     def calculate_reaction_time(
@@ -180,10 +438,45 @@ class WorkingTimeCalculator:
         return cls.calculate_working_time(assigned_dt, end_dt, city)
 
 
-def _parse_datetime(value: str, formats: Iterable[str]) -> datetime:
-    """Парсит дату/время из строки, пробуя несколько форматов."""
+# Форматы даты/времени, которые принимает интерактивный ввод
+_DATETIME_FORMATS: Tuple[str, ...] = (
+    "%Y-%m-%d %H:%M",
+    "%Y-%m-%d %H:%M:%S",
+    "%d.%m.%Y %H:%M",
+    "%d.%m.%Y %H:%M:%S",
+    "%Y-%m-%dT%H:%M",
+    "%Y-%m-%dT%H:%M:%S",
+)
+
+# Стандартные форматы ввода: 2026-01-19 10:30[:00], 2026-01-19T10:30[:00],
+# 19.01.2026 10:30[:00]
+_DATETIME_RE = re.compile(
+    r"(\d{4})-(\d{1,2})-(\d{1,2})[ T](\d{1,2}):(\d{1,2})(?::(\d{1,2}))?"
+    r"|(\d{1,2})\.(\d{1,2})\.(\d{4}) (\d{1,2}):(\d{1,2})(?::(\d{1,2}))?",
+    re.ASCII,
+)
+
+
+def _parse_datetime(value: str) -> datetime:
+    """
+    Парсит дату/время из строки в одном из форматов _DATETIME_FORMATS.
+
+    Стандартные форматы разбираются одним регулярным выражением,
+    остальные варианты записи - перебором форматов через strptime.
+    """
+    match = _DATETIME_RE.fullmatch(value)
+    if match:
+        groups = match.groups()
+        if groups[0] is not None:
+            year, month, day, hour, minute, second = groups[:6]
+        else:
+            day, month, year, hour, minute, second = groups[6:]
+        return datetime(
+            int(year), int(month), int(day), int(hour), int(minute), int(second or 0)
+        )
+
     last_error: Optional[ValueError] = None
-    for fmt in formats:
+    for fmt in _DATETIME_FORMATS:
         try:
             return datetime.strptime(value, fmt)
         except ValueError as exc:
@@ -195,22 +488,13 @@ def _parse_datetime(value: str, formats: Iterable[str]) -> datetime:
 
 def _read_datetime(prompt: str) -> datetime:
     """Читает дату/время из ввода пользователя в удобных форматах."""
-    formats = (
-        "%Y-%m-%d %H:%M",
-        "%Y-%m-%d %H:%M:%S",
-        "%d.%m.%Y %H:%M",
-        "%d.%m.%Y %H:%M:%S",
-        "%Y-%m-%dT%H:%M",
-        "%Y-%m-%dT%H:%M:%S",
-    )
-
     while True:
         raw = input(prompt).strip()
         if not raw:
             print("Пустое значение. Пример: 2026-01-19 10:30")
             continue
         try:
-            return _parse_datetime(raw, formats)
+            return _parse_datetime(raw)
         except ValueError:
             print(
                 "Не удалось распознать дату/время. "
@@ -241,7 +525,7 @@ def main() -> None:
     print("Форматы дат: 2026-01-19 10:30 | 19.01.2026 10:30")
     print(
         "Города: "
-        + ", ".join(sorted(WorkingTimeCalculator.CITY_SCHEDULES.keys()))
+        + ", ".join(WorkingTimeCalculator.CITY_NAMES_SORTED)
         + " (или оставьте пустым для графика по умолчанию)"
     )
     print()